@@ -1,23 +1,28 @@
 from __future__ import annotations
 
 import json
+import multiprocessing
 import os
-import random
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from datetime import datetime
-from typing import Any, Dict, Iterable, List
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Sequence, Tuple
 from urllib import error as urlerror
 from urllib import request as urlrequest
 
 import numpy as np
+import orjson
 import pandas as pd
-from flask import Flask, jsonify, request
+from flask import Flask, Response, request
 from flask_cors import CORS
 from great_tables import GT
 
 app = Flask(__name__)
 CORS(app)
 
-rng = random.Random(42)
 np_rng = np.random.default_rng(42)
 
 MULTI_SELECT_COLUMNS = {
@@ -43,6 +48,8 @@ ORDINAL_COLUMNS = {
     "F6_FoodSituation": ["Worsened", "Stayed the same", "Improved"],
 }
 
+ORDINAL_DTYPES = {column: pd.CategoricalDtype(order, ordered=True) for column, order in ORDINAL_COLUMNS.items()}
+
 PATH_COLOURS = {
     "treatment": "#2563eb",  # blue
     "control": "#16a34a",  # green
@@ -95,6 +102,9 @@ LABEL_MAP: Dict[str, str] = {
     "H4_Risks": "H4. Risks to sustain benefits",
 }
 
+# Stamped once per process so identical queries render byte-identical (cacheable) HTML.
+GENERATED_NOTE = f"Generated {datetime.utcnow():%d %b %Y %H:%M} UTC"
+
 PATH_LABELS = {
     "treatment": "Treatment",
     "control": "Control",
@@ -102,15 +112,35 @@ PATH_LABELS = {
     "validation": "Validation",
 }
 
+_DEFAULT_PATHS = tuple(PATH_LABELS)
+_DEFAULT_SIDE_BREAKS = ("B2_Participation",)
+_DEFAULT_TOP_BREAKS = ("A7_Sex",)
+
 
-def _pick_many(options: Iterable[str], minimum: int = 1, maximum: int | None = None) -> List[str]:
-    opts = list(options)
-    if not opts:
-        return []
+def _pick_many(options: Iterable[str], rows: int, minimum: int = 1, maximum: int | None = None) -> List[List[str]]:
+    opts = np.asarray(list(options))
+    if opts.size == 0:
+        return [[] for _ in range(rows)]
     if maximum is None:
-        maximum = len(opts)
-    k = rng.randint(minimum, maximum)
-    return sorted(rng.sample(opts, k))
+        maximum = opts.size
+    # Sample without replacement for every row at once: argsort a random key
+    # matrix and keep the first k positions of each row.
+    order = np.argsort(np_rng.random((rows, opts.size)), axis=1)
+    sizes = np_rng.integers(minimum, maximum + 1, size=rows)
+    return [sorted(opts[order[idx, : sizes[idx]]].tolist()) for idx in range(rows)]
+
+
+def _pick_one(
+    options: List[str],
+    rows: int,
+    p: List[float] | None = None,
+    ordered: bool = False,
+) -> pd.Categorical:
+    # Ordinal answers keep their scale order; other banners get sorted categories like astype("category").
+    dtype = pd.CategoricalDtype(options if ordered else sorted(set(options)), ordered=ordered)
+    # Draw option positions and map them to category codes, so no string array is materialised.
+    positions = np_rng.choice(len(options), size=rows, p=p)
+    return pd.Categorical.from_codes(dtype.categories.get_indexer(options)[positions], dtype=dtype)
 
 
 def create_mock_dataframe(rows: int = 220) -> pd.DataFrame:
@@ -127,6 +157,7 @@ def create_mock_dataframe(rows: int = 220) -> pd.DataFrame:
     education = ["None", "Primary", "Secondary", "Vocational", "Tertiary"]
     consent = ["Yes", "No"]
     sex = ["Male", "Female", "Other"]
+    yes_no = ["Yes", "No"]
 
     program_names = ["OGSTEP", "N-Power", "Fadama", "YouWin", "Private accelerator"]
     employment_status = ["Wage employment", "Self-employed", "Apprentice", "Unemployed"]
@@ -142,74 +173,72 @@ def create_mock_dataframe(rows: int = 220) -> pd.DataFrame:
     influence = ["Much more", "Somewhat more", "No change", "Less able"]
     continue_support = ["Yes", "No", "Unsure"]
 
-    data = []
-    for idx in range(rows):
-        path = np_rng.choice(["treatment", "control", "common", "validation"], p=[0.35, 0.3, 0.25, 0.1])
-        record = {
-            "SubmissionID": f"RESP-{idx+1:04d}",
-            "survey_path": path,
-            "A3_LGA": rng.choice(lgas),
-            "A6_Consent": rng.choice(consent),
-            "A7_Sex": rng.choice(sex),
-            "A9_MaritalStatus": rng.choice(marital),
-            "A10_Education": rng.choice(education),
-            "A12_EnumeratorObservation": rng.choice(enumerator_obs),
-            "B1_Awareness": rng.choice(["Yes", "No"]),
-            "B2_Participation": rng.choice(["Yes", "No"]),
-            "B4_SupportType": _pick_many(["Training", "Finance", "Inputs", "Market", "Other"], 1, 3),
-            "B6_OtherPrograms": rng.choice(["Yes", "No"]),
-            "B7_ProgramName": rng.choice(program_names),
-            "C1_OGSTEPTrainingCompleted": rng.choice(["Yes", "No"]),
-            "C2_TrainingType": _pick_many(training_types, 1, 3),
-            "C3_NonOGSTEPTraining": rng.choice(["Yes", "No"]),
-            "C4_EmploymentStatus": rng.choice(employment_status),
-            "C7_JobRelated": rng.choice(["Yes", "No"]),
-            "C8_Barriers": _pick_many(barriers, 1, 3),
-            "D1_CurrentlyFarm": rng.choice(["Yes", "No"]),
-            "D2_EnterpriseType": _pick_many(enterprise_types, 1, 2),
-            "D6_OGSTEPInputs": _pick_many(inputs, 1, 3),
-            "D7_OtherInputs": rng.choice(other_inputs),
-            "D11_OffTaker": rng.choice(["Yes", "No"]),
-            "E1_OwnBusiness": rng.choice(["Yes", "No"]),
-            "E2_Sector": _pick_many(sectors, 1, 2),
-            "E6_OGSTEPFinance": rng.choice(["Yes", "No"]),
-            "E7_OtherSupport": rng.choice(["Yes", "No"]),
-            "E8_NewTechnology": rng.choice(["Yes", "No"]),
-            "E9_Constraints": _pick_many(constraints, 1, 3),
-            "F1_WorryFood": rng.choice(ORDINAL_COLUMNS["F1_WorryFood"]),
-            "F2_SmallerMeals": rng.choice(ORDINAL_COLUMNS["F2_SmallerMeals"]),
-            "F3_FewerMeals": rng.choice(ORDINAL_COLUMNS["F3_FewerMeals"]),
-            "F4_SleptHungry": rng.choice(ORDINAL_COLUMNS["F4_SleptHungry"]),
-            "F5_NoFood": rng.choice(ORDINAL_COLUMNS["F5_NoFood"]),
-            "F6_FoodSituation": rng.choice(ORDINAL_COLUMNS["F6_FoodSituation"]),
-            "G1_IncomeDecisions": rng.choice(["Self", "Spouse", "Joint", "Other"]),
-            "G2_SavingsCredit": rng.choice(["Yes", "No"]),
-            "G3_GroupMember": _pick_many(group_member, 1, 2),
-            "G4_Influence": rng.choice(influence),
-            "H1_Satisfaction": rng.choice(ORDINAL_COLUMNS["H1_Satisfaction"]),
-            "H2_Trust": rng.choice(ORDINAL_COLUMNS["H2_Trust"]),
-            "H3_ContinueWithoutSupport": rng.choice(continue_support),
-            "H4_Risks": _pick_many(risks, 1, 3),
-        }
-
-        data.append(record)
+    # Draw each column in one vectorised call, already in its final dtype, and assemble the frame once.
+    columns = {
+        "SubmissionID": pd.array([f"RESP-{idx:04d}" for idx in range(1, rows + 1)], dtype="string[pyarrow]"),
+        "survey_path": _pick_one(["treatment", "control", "common", "validation"], rows, p=[0.35, 0.3, 0.25, 0.1]),
+        "A3_LGA": _pick_one(lgas, rows),
+        "A6_Consent": _pick_one(consent, rows),
+        "A7_Sex": _pick_one(sex, rows),
+        "A9_MaritalStatus": _pick_one(marital, rows),
+        "A10_Education": _pick_one(education, rows),
+        "A12_EnumeratorObservation": _pick_one(enumerator_obs, rows),
+        "B1_Awareness": _pick_one(yes_no, rows),
+        "B2_Participation": _pick_one(yes_no, rows),
+        "B4_SupportType": _pick_many(["Training", "Finance", "Inputs", "Market", "Other"], rows, 1, 3),
+        "B6_OtherPrograms": _pick_one(yes_no, rows),
+        "B7_ProgramName": _pick_one(program_names, rows),
+        "C1_OGSTEPTrainingCompleted": _pick_one(yes_no, rows),
+        "C2_TrainingType": _pick_many(training_types, rows, 1, 3),
+        "C3_NonOGSTEPTraining": _pick_one(yes_no, rows),
+        "C4_EmploymentStatus": _pick_one(employment_status, rows),
+        "C7_JobRelated": _pick_one(yes_no, rows),
+        "C8_Barriers": _pick_many(barriers, rows, 1, 3),
+        "D1_CurrentlyFarm": _pick_one(yes_no, rows),
+        "D2_EnterpriseType": _pick_many(enterprise_types, rows, 1, 2),
+        "D6_OGSTEPInputs": _pick_many(inputs, rows, 1, 3),
+        "D7_OtherInputs": _pick_one(other_inputs, rows),
+        "D11_OffTaker": _pick_one(yes_no, rows),
+        "E1_OwnBusiness": _pick_one(yes_no, rows),
+        "E2_Sector": _pick_many(sectors, rows, 1, 2),
+        "E6_OGSTEPFinance": _pick_one(yes_no, rows),
+        "E7_OtherSupport": _pick_one(yes_no, rows),
+        "E8_NewTechnology": _pick_one(yes_no, rows),
+        "E9_Constraints": _pick_many(constraints, rows, 1, 3),
+        "F1_WorryFood": _pick_one(ORDINAL_COLUMNS["F1_WorryFood"], rows, ordered=True),
+        "F2_SmallerMeals": _pick_one(ORDINAL_COLUMNS["F2_SmallerMeals"], rows, ordered=True),
+        "F3_FewerMeals": _pick_one(ORDINAL_COLUMNS["F3_FewerMeals"], rows, ordered=True),
+        "F4_SleptHungry": _pick_one(ORDINAL_COLUMNS["F4_SleptHungry"], rows, ordered=True),
+        "F5_NoFood": _pick_one(ORDINAL_COLUMNS["F5_NoFood"], rows, ordered=True),
+        "F6_FoodSituation": _pick_one(ORDINAL_COLUMNS["F6_FoodSituation"], rows, ordered=True),
+        "G1_IncomeDecisions": _pick_one(["Self", "Spouse", "Joint", "Other"], rows),
+        "G2_SavingsCredit": _pick_one(yes_no, rows),
+        "G3_GroupMember": _pick_many(group_member, rows, 1, 2),
+        "G4_Influence": _pick_one(influence, rows),
+        "H1_Satisfaction": _pick_one(ORDINAL_COLUMNS["H1_Satisfaction"], rows, ordered=True),
+        "H2_Trust": _pick_one(ORDINAL_COLUMNS["H2_Trust"], rows, ordered=True),
+        "H3_ContinueWithoutSupport": _pick_one(continue_support, rows),
+        "H4_Risks": _pick_many(risks, rows, 1, 3),
+    }
 
-    df = pd.DataFrame(data)
-    for column, order in ORDINAL_COLUMNS.items():
-        if column in df.columns:
-            df[column] = pd.Categorical(df[column], categories=order, ordered=True)
-    return df
+    return pd.DataFrame(columns)
 
 
 def explode_columns(df: pd.DataFrame, columns: Iterable[str]) -> pd.DataFrame:
-    result = df.copy()
-    for column in columns:
-        if column in MULTI_SELECT_COLUMNS and column in result.columns:
-            result = result.explode(column)
-    drop_columns = [column for column in columns if column in MULTI_SELECT_COLUMNS]
-    if drop_columns:
-        result = result.dropna(subset=drop_columns)
-    return result
+    # Columns that are already categorical have been exploded (see _exploded_frame).
+    multi_columns = [
+        column
+        for column in dict.fromkeys(columns)
+        if column in MULTI_SELECT_COLUMNS and column in df.columns and df[column].dtype == object
+    ]
+    if not multi_columns:
+        return df
+    # explode already returns a new frame, so the input is never mutated.
+    result = df
+    for column in multi_columns:
+        result = result.explode(column)
+        result[column] = result[column].astype("category")
+    return result.dropna(subset=multi_columns)
 
 
 def format_table(df: pd.DataFrame, side_break: str, top_breaks: List[str], mode: str) -> str:
@@ -222,25 +251,24 @@ def format_table(df: pd.DataFrame, side_break: str, top_breaks: List[str], mode:
         display_df.rename(columns={"index": side_label, side_break: side_label}, inplace=True)
 
     # Format percentages directly in the dataframe to avoid missing formatter support.
-    if mode != "count":
-        metric_columns = [col for col in display_df.columns if col != side_label]
-        for column in metric_columns:
-            display_df[column] = display_df[column].apply(
-                lambda value: f"{value:.1f}%" if isinstance(value, (float, np.floating)) else value
-            )
-    else:
-        metric_columns = [col for col in display_df.columns if col != side_label]
-        for column in metric_columns:
-            display_df[column] = display_df[column].apply(
-                lambda value: int(value) if isinstance(value, (float, np.floating)) else value
-            )
+    # Only float columns need work, so format them as one block rather than cell by cell.
+    float_columns = [
+        column
+        for column in display_df.columns
+        if column != side_label and pd.api.types.is_float_dtype(display_df[column])
+    ]
+    if float_columns:
+        if mode != "count":
+            display_df[float_columns] = np.char.mod("%.1f%%", display_df[float_columns].to_numpy())
+        else:
+            display_df[float_columns] = display_df[float_columns].astype("int64")
 
     subtitle = " + ".join(LABEL_MAP.get(col, col) for col in top_breaks) if top_breaks else "Overall distribution"
 
     table = (
         GT(display_df)
         .tab_header(title=side_label, subtitle=subtitle)
-        .tab_source_note(f"Generated {datetime.utcnow():%d %b %Y %H:%M} UTC")
+        .tab_source_note(GENERATED_NOTE)
     )
 
     return table.as_html()
@@ -252,27 +280,62 @@ def build_crosstab(
     top_breaks: List[str],
     mode: str,
 ) -> pd.DataFrame:
-    normalize_map = {
-        "count": None,
-        "rowPercent": "index",
-        "columnPercent": "columns",
-        "totalPercent": "all",
-    }
     prepared = explode_columns(dataframe, [side_break, *top_breaks])
-    normalize = normalize_map.get(mode, None)
-
-    top_arrays = [prepared[top] for top in top_breaks] if top_breaks else None
-    crosstab = pd.crosstab(
-        index=prepared[side_break],
-        columns=top_arrays if top_arrays else [],
-        normalize=normalize,
-        margins=True,
-        margins_name="Total",
-        dropna=False,
-    )
 
-    if mode != "count":
-        crosstab = (crosstab * 100).round(1)
+    # Count every (side, *top) combination in one bincount over the categorical codes rather than
+    # going through pd.crosstab, which re-factorises every input and normalises via pivot_table.
+    # Like crosstab(dropna=False), the result covers the full product of the key categories.
+    keys = []
+    for column in [side_break, *top_breaks]:
+        series = prepared[column]
+        keys.append(series if isinstance(series.dtype, pd.CategoricalDtype) else series.astype("category"))
+    codes = [key.cat.codes.to_numpy() for key in keys]
+    shape = tuple(len(key.cat.categories) for key in keys)
+    valid = np.logical_and.reduce([code >= 0 for code in codes])
+    flat = np.ravel_multi_index([code[valid] for code in codes], shape)
+    cells = int(np.prod(shape))
+    cube = np.bincount(flat, minlength=cells).reshape(shape[0], cells // shape[0] if shape[0] else 0)
+
+    matrix = cube.astype(np.float64)
+    if len(keys) > 2:
+        columns = list(pd.MultiIndex.from_product([key.cat.categories for key in keys[1:]]))
+    elif len(keys) == 2:
+        columns = list(keys[1].cat.categories)
+    else:
+        # Without top breaks the single count column becomes the Total column.
+        columns = []
+        matrix = matrix[:, :0]
+    row_totals = cube.sum(axis=1, keepdims=True).astype(np.float64)
+    column_totals = matrix.sum(axis=0, keepdims=True)
+    grand_total = row_totals.sum()
+
+    # Margins follow pd.crosstab: row % keeps only the Total row, column % only the Total column.
+    with np.errstate(divide="ignore", invalid="ignore"):
+        if mode == "rowPercent":
+            body = np.vstack([matrix / row_totals, column_totals / grand_total])
+        elif mode == "columnPercent":
+            body = np.hstack([matrix / column_totals, row_totals / grand_total])
+        elif mode == "totalPercent":
+            body = np.block([[matrix, row_totals], [column_totals, grand_total]]) / grand_total
+        else:
+            body = np.block([[matrix, row_totals], [column_totals, grand_total]])
+    body = np.nan_to_num(body, nan=0.0, posinf=0.0, neginf=0.0)
+
+    if mode != "rowPercent":
+        columns.append(("Total",) + ("",) * (len(top_breaks) - 1) if len(top_breaks) > 1 else "Total")
+    column_index = pd.Index(columns)
+    if top_breaks and column_index.nlevels == len(top_breaks):
+        column_index = column_index.set_names(top_breaks)
+    index = list(keys[0].cat.categories)
+    if mode != "columnPercent":
+        index.append("Total")
+    row_index = pd.Index(index, name=side_break)
+
+    # One-decimal percentages and counts fit comfortably in 4-byte types, halving what formatting touches.
+    if mode in ("rowPercent", "columnPercent", "totalPercent"):
+        crosstab = pd.DataFrame((body * 100).round(1).astype(np.float32), index=row_index, columns=column_index)
+    else:
+        crosstab = pd.DataFrame(body.astype(np.int32), index=row_index, columns=column_index)
 
     if isinstance(crosstab.columns, pd.MultiIndex):
         crosstab.columns = [
@@ -288,7 +351,7 @@ def build_crosstab(
     return crosstab
 
 
-def build_chart_payload(dataframe: pd.DataFrame, side_break: str, paths: List[str]) -> Dict[str, object] | None:
+def build_chart_payload(dataframe: pd.DataFrame, side_break: str, paths: Sequence[str]) -> Dict[str, object] | None:
     if not paths:
         return None
     relevant_paths = [path for path in paths if path in ("treatment", "control")]
@@ -296,31 +359,43 @@ def build_chart_payload(dataframe: pd.DataFrame, side_break: str, paths: List[st
         return None
 
     prepared = explode_columns(dataframe, [side_break])
-    grouped = prepared.groupby(["survey_path", side_break]).size().reset_index(name="count")
-    grouped = grouped[grouped["survey_path"].isin(relevant_paths)]
-    if grouped.empty:
+    path_series = prepared["survey_path"]
+    side_series = prepared[side_break]
+    if not isinstance(path_series.dtype, pd.CategoricalDtype):
+        path_series = path_series.astype("category")
+    if not isinstance(side_series.dtype, pd.CategoricalDtype):
+        side_series = side_series.astype("category")
+
+    # Tally (path, answer) pairs straight from the category codes into a dense matrix.
+    path_codes = path_series.cat.codes.to_numpy()
+    side_codes = side_series.cat.codes.to_numpy()
+    valid = (path_codes >= 0) & (side_codes >= 0)
+    counts = np.zeros((len(path_series.cat.categories), len(side_series.cat.categories)), dtype=np.int64)
+    np.add.at(counts, (path_codes[valid], side_codes[valid]), 1)
+
+    relevant_codes = path_series.cat.categories.get_indexer(relevant_paths)
+    relevant_counts = np.where(relevant_codes[:, None] >= 0, counts[relevant_codes], 0)
+    observed = relevant_counts.sum(axis=0) > 0
+    if not observed.any():
         return None
-    totals = grouped.groupby("survey_path")["count"].transform("sum")
-    grouped["percent"] = (grouped["count"] / totals * 100).round(1)
-
-    labels = list(dict.fromkeys(grouped[side_break].astype(str)))
-    datasets = []
-    for path in relevant_paths:
-        subset = grouped[grouped["survey_path"] == path]
-        values = []
-        for label in labels:
-            match = subset[subset[side_break].astype(str) == label]
-            if match.empty:
-                values.append(0.0)
-            else:
-                values.append(float(match.iloc[0]["percent"]))
-        datasets.append(
-            {
-                "label": PATH_LABELS.get(path, path),
-                "backgroundColor": PATH_COLOURS.get(path, "#475569"),
-                "data": values,
-            }
-        )
+    relevant_counts = relevant_counts[:, observed]
+    totals = relevant_counts.sum(axis=1, keepdims=True)
+    # Divide, scale and round in place so the only allocation is the output matrix.
+    percent = np.zeros(relevant_counts.shape, dtype=np.float64)
+    np.divide(relevant_counts, totals, out=percent, where=totals > 0)
+    percent *= 100
+    np.round(percent, 1, out=percent)
+
+    # Labels come straight from the categories; only the observed ones are stringified.
+    labels = side_series.cat.categories[observed].astype(str).tolist()
+    datasets = [
+        {
+            "label": PATH_LABELS.get(path, path),
+            "backgroundColor": PATH_COLOURS.get(path, "#475569"),
+            "data": percent[position].tolist(),
+        }
+        for position, path in enumerate(relevant_paths)
+    ]
 
     return {
         "sideBreak": LABEL_MAP.get(side_break, side_break),
@@ -347,13 +422,14 @@ def build_insights(chart_payload: Dict[str, object] | None, mode: str) -> List[s
     if not treatment_values or not control_values:
         return insights
 
-    differences = [t - c for t, c in zip(treatment_values, control_values)]
-    if not differences:
-        return insights
+    size = min(len(treatment_values), len(control_values))
+    differences = np.asarray(treatment_values[:size], dtype=np.float64) - np.asarray(
+        control_values[:size], dtype=np.float64
+    )
 
     max_idx = int(np.argmax(np.abs(differences)))
     label = labels[max_idx]
-    delta = differences[max_idx]
+    delta = float(differences[max_idx])
     comparator = "higher" if delta > 0 else "lower"
     insights.append(
         f"Treatment group shows {abs(delta):.1f} percentage points {comparator} {label.lower()} compared with the control group."
@@ -415,11 +491,25 @@ def _fetch_apps_script_rows() -> List[Dict[str, Any]]:
     return structured_rows
 
 
+def _json_response(payload: Any, status: int = 200) -> Response:
+    # orjson serialises NumPy scalars natively, so counts and percentages need no Python-side conversion.
+    return app.response_class(
+        orjson.dumps(payload, option=orjson.OPT_SERIALIZE_NUMPY),
+        status=status,
+        mimetype="application/json",
+    )
+
+
+def _dataset_cache_key() -> str:
+    return APPS_SCRIPT_URL or "mock"
+
+
 def load_dataframe() -> pd.DataFrame:
-    cache_key = APPS_SCRIPT_URL or "mock"
+    """Return the cached dataset. The frame is shared between requests and must not be mutated."""
+    cache_key = _dataset_cache_key()
     cached = _DATAFRAME_CACHE.get(cache_key)
     if cached is not None:
-        return cached.copy()
+        return cached
 
     if not APPS_SCRIPT_URL:
         df = SURVEY_DATAFRAME.copy()
@@ -430,41 +520,168 @@ def load_dataframe() -> pd.DataFrame:
     if df.empty:
         raise RuntimeError("Apps Script returned no rows")
 
-    for column, order in ORDINAL_COLUMNS.items():
-        if column in df.columns:
-            df[column] = pd.Categorical(df[column], categories=order, ordered=True)
+    dtypes: Dict[str, Any] = {column: dtype for column, dtype in ORDINAL_DTYPES.items() if column in df.columns}
+    if "survey_path" in df.columns and not isinstance(df["survey_path"].dtype, pd.CategoricalDtype):
+        dtypes["survey_path"] = "category"
+    df = df.astype(dtypes, copy=False)
 
     _DATAFRAME_CACHE[cache_key] = df
-    return df.copy()
+    return df
+
+
+@lru_cache(maxsize=64)
+def _exploded_frame(cache_key: str, columns: Tuple[str, ...]) -> pd.DataFrame:
+    return explode_columns(_DATAFRAME_CACHE[cache_key], columns)
+
+
+def _filtered_frame(cache_key: str, columns: Iterable[str], selected_paths: Iterable[str]) -> pd.DataFrame:
+    """Return the cached dataset exploded on ``columns`` and limited to ``selected_paths``.
+
+    Exploded and filtered frames are memoised, so repeat requests are a cache lookup.
+    """
+    multi_columns = tuple(sorted({column for column in columns if column in MULTI_SELECT_COLUMNS}))
+    return _path_filtered_frame(cache_key, multi_columns, tuple(selected_paths))
+
+
+@lru_cache(maxsize=64)
+def _path_filtered_frame(cache_key: str, multi_columns: Tuple[str, ...], paths: Tuple[str, ...]) -> pd.DataFrame:
+    if multi_columns:
+        dataframe = _exploded_frame(cache_key, multi_columns)
+    else:
+        dataframe = _DATAFRAME_CACHE[cache_key]
+    return dataframe.loc[_path_mask(dataframe["survey_path"], paths)]
+
+
+def _render_table(
+    cache_key: str,
+    side_break: str,
+    top_breaks: Tuple[str, ...],
+    mode: str,
+    paths: Tuple[str, ...],
+) -> str:
+    prepared = _filtered_frame(cache_key, [side_break, *top_breaks], paths)
+    crosstab = build_crosstab(prepared, side_break, list(top_breaks), mode)
+    return format_table(crosstab, side_break, list(top_breaks), mode)
+
+
+def _init_worker(cache_key: str, dataframe: pd.DataFrame, generated_note: str) -> None:
+    # Workers render from the parent's snapshot instead of fetching Apps Script themselves,
+    # and reuse its note so pooled and inline renders produce identical HTML.
+    global GENERATED_NOTE
+    GENERATED_NOTE = generated_note
+    _DATAFRAME_CACHE[cache_key] = dataframe
+
+
+_TableKey = Tuple[str, str, Tuple[str, ...], str, Tuple[str, ...]]
+
+# Rendered table HTML, shared by inline and pooled renders. The dataset is immutable once
+# loaded, so the key fully determines the HTML.
+_TABLE_CACHE: "OrderedDict[_TableKey, str]" = OrderedDict()
+_TABLE_CACHE_SIZE = 256
+_TABLE_CACHE_LOCK = threading.Lock()
+
+_MAX_RENDER_WORKERS = 4
+_EXECUTOR: ProcessPoolExecutor | None = None
+_EXECUTOR_LOCK = threading.Lock()
+
+
+def _get_executor(cache_key: str) -> ProcessPoolExecutor:
+    global _EXECUTOR
+    with _EXECUTOR_LOCK:
+        if _EXECUTOR is None:
+            # Created lazily and with spawn: forking a threaded server process is not safe.
+            # Capped because every server worker process gets its own pool.
+            _EXECUTOR = ProcessPoolExecutor(
+                max_workers=min(_MAX_RENDER_WORKERS, os.cpu_count() or 1),
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(cache_key, _DATAFRAME_CACHE[cache_key], GENERATED_NOTE),
+            )
+        return _EXECUTOR
+
+
+def _discard_executor(executor: ProcessPoolExecutor) -> None:
+    global _EXECUTOR
+    with _EXECUTOR_LOCK:
+        if _EXECUTOR is executor:
+            _EXECUTOR = None
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _render_tables(keys: Sequence[_TableKey]) -> List[str]:
+    with _TABLE_CACHE_LOCK:
+        rendered = {key: _TABLE_CACHE[key] for key in keys if key in _TABLE_CACHE}
+        for key in rendered:
+            _TABLE_CACHE.move_to_end(key)
+    missing = [key for key in dict.fromkeys(keys) if key not in rendered]
+
+    if len(missing) > 1:
+        # Each side break is an independent table; render them in parallel outside the GIL.
+        # A single table is rendered inline since the IPC round trip would outweigh the work.
+        executor = _get_executor(missing[0][0])
+        try:
+            futures = [executor.submit(_render_table, *key) for key in missing]
+            rendered.update(zip(missing, (future.result() for future in futures)))
+        except BrokenProcessPool:
+            # A worker died; drop the pool so the next request starts a fresh one.
+            _discard_executor(executor)
+    for key in missing:
+        if key not in rendered:
+            rendered[key] = _render_table(*key)
+
+    with _TABLE_CACHE_LOCK:
+        for key in missing:
+            _TABLE_CACHE[key] = rendered[key]
+        while len(_TABLE_CACHE) > _TABLE_CACHE_SIZE:
+            _TABLE_CACHE.popitem(last=False)
+    return [rendered[key] for key in keys]
+
+
+def _path_mask(survey_path: pd.Series, selected_paths: Iterable[str]) -> np.ndarray:
+    if not isinstance(survey_path.dtype, pd.CategoricalDtype):
+        return survey_path.isin(selected_paths).to_numpy()
+    # Compare the small integer codes rather than the path strings.
+    selected_codes = survey_path.cat.categories.get_indexer(list(selected_paths))
+    return np.isin(survey_path.cat.codes.to_numpy(), selected_codes[selected_codes >= 0])
 
 
 @app.route("/generate_table", methods=["POST"])
 def generate_table():
-    payload = request.get_json(force=True)
-    top_breaks = payload.get("topBreaks", [])
-    side_breaks = payload.get("sideBreaks", [])
+    try:
+        payload = orjson.loads(request.get_data())
+    except orjson.JSONDecodeError:
+        return _json_response({"error": "Request body must be valid JSON"}, status=400)
+    if not isinstance(payload, dict):
+        return _json_response({"error": "Request body must be a JSON object"}, status=400)
+    top_breaks = payload.get("topBreaks") or _DEFAULT_TOP_BREAKS
+    side_breaks = payload.get("sideBreaks") or _DEFAULT_SIDE_BREAKS
     mode = payload.get("mode", "count")
-    selected_paths = payload.get("paths", list(PATH_LABELS.keys()))
-    if not side_breaks:
-        side_breaks = ["B2_Participation"]
-    if not top_breaks:
-        top_breaks = ["A7_Sex"]
+    selected_paths = payload.get("paths", _DEFAULT_PATHS)
+    if not isinstance(selected_paths, (list, tuple)) or not all(isinstance(path, str) for path in selected_paths):
+        return _json_response({"error": "'paths' must be a list of strings"}, status=400)
 
     try:
         dataframe = load_dataframe()
     except RuntimeError as exc:
-        return jsonify({"error": str(exc)}), 400
+        return _json_response({"error": str(exc)}, status=400)
 
     if "survey_path" not in dataframe.columns:
-        return jsonify({"error": "Dataset must include a 'survey_path' column"}), 400
+        return _json_response({"error": "Dataset must include a 'survey_path' column"}, status=400)
+
+    cache_key = _dataset_cache_key()
+    filtered_df = _filtered_frame(cache_key, [], selected_paths)
+
+    # Everything that does not depend on the side break is computed once up front.
+    top_breaks_key = tuple(top_breaks)
+    paths_key = tuple(selected_paths)
+    top_breaks_label = ", ".join(LABEL_MAP.get(tb, tb) for tb in top_breaks)
+    title_suffix = " + ".join(LABEL_MAP.get(tb, tb) for tb in top_breaks) if top_breaks else "Overall"
+    selected_paths_label = ", ".join(PATH_LABELS.get(path, path) for path in selected_paths)
 
-    filtered_df = dataframe[dataframe["survey_path"].isin(selected_paths)]
+    rendered = _render_tables([(cache_key, side, top_breaks_key, mode, paths_key) for side in side_breaks])
 
     tables = []
-    for side in side_breaks:
-        crosstab = build_crosstab(filtered_df, side, top_breaks, mode)
-        html = format_table(crosstab, side, top_breaks, mode)
-        title_suffix = " + ".join(LABEL_MAP.get(tb, tb) for tb in top_breaks) if top_breaks else "Overall"
+    for side, html in zip(side_breaks, rendered):
         tables.append(
             {
                 "sideBreak": side,
@@ -474,7 +691,8 @@ def generate_table():
             }
         )
 
-    chart_payload = build_chart_payload(filtered_df, side_breaks[0], selected_paths)
+    chart_frame = _filtered_frame(cache_key, [side_breaks[0]], selected_paths)
+    chart_payload = build_chart_payload(chart_frame, side_breaks[0], selected_paths)
     insights = build_insights(chart_payload, mode)
 
     response = {
@@ -484,14 +702,16 @@ def generate_table():
         "metadata": {
             "rowCount": int(filtered_df.shape[0]),
             "appliedFilters": [
-                "Paths: " + ", ".join(PATH_LABELS.get(path, path) for path in selected_paths),
+                "Paths: " + selected_paths_label,
                 "Display: " + mode,
-                "Top breaks: " + ", ".join(LABEL_MAP.get(tb, tb) for tb in top_breaks),
+                "Top breaks: " + top_breaks_label,
             ],
         },
     }
-    return jsonify(response)
+    return _json_response(response)
 
 
 if __name__ == "__main__":
-    app.run(host="0.0.0.0", port=8000, debug=True)
+    # Local development only; deploy with gunicorn, e.g.
+    #   gunicorn -w 4 -k gthread --chdir analysis_backend app:app
+    app.run()
@@ -1,12 +1,18 @@
+import glob
+import hashlib
 import json
-import math
 import os
+import tempfile
+from collections import OrderedDict
+from functools import lru_cache
 from typing import Any, Dict, List, Optional
 from urllib import error, request
 
 import numpy as np
+import orjson
 import pandas as pd
 from great_tables import GT
+from pandas.api.types import is_numeric_dtype
 
 CURATED_TOP_BREAKS = [
     "a3_select_the_lga",
@@ -25,17 +31,46 @@ DEFAULT_LIMIT_CATEGORIES = 12
 DEFAULT_BINS = 10
 DEFAULT_MIN_COUNT = 1
 DEFAULT_STAT = "rowpct"
+DEFAULT_FORMAT = "all"
+# Rows sampled per column when guessing whether a text column is numeric.
+_INFER_SAMPLE_SIZE = 2000
+# Text columns with at most this many distinct values are stored as categoricals.
+_CATEGORY_MAX_DISTINCT = 50
+# Prepared top-break series kept per dataset load.
+_TOPBREAK_MEMO_SIZE = 16
 
 _ALLOWED_STATS = {"counts", "rowpct", "colpct", "totalpct"}
+# "chart" skips the great_tables render, "chart_nohist" also skips the numeric histogram,
+# and "html" skips the chart payload.
+_ALLOWED_FORMATS = {"all", "html", "chart", "chart_nohist"}
+_HTML_FORMATS = {"all", "html"}
+_HISTOGRAM_FORMATS = {"all", "chart"}
 
-_DATA_CACHE: Dict[str, Any] = {"df": None, "fields": None}
+# Upper (inclusive) edges of the a8_age bands; anything above the last edge is 45+.
+_AGE_EDGES = np.array([24, 34, 44])
+_AGE_DTYPE = pd.CategoricalDtype(["15-24", "25-34", "35-44", "45+"], ordered=True)
+
+_DATA_CACHE: Dict[str, Any] = {
+    "df": None,
+    "fields": None,
+    "field_meta": {},
+    "numeric": {},
+    "topbreak_series": OrderedDict(),
+}
+
+# Normalized datasets are snapshotted here as Parquet, keyed by a hash of the raw dashboard payload.
+_SNAPSHOT_DIR = os.environ.get("ANALYSIS_SNAPSHOT_DIR") or tempfile.gettempdir()
 
 
 def _json_response(payload: Any, status: int = 200) -> Dict[str, Any]:
+    return _json_body_response(json.dumps(payload, default=_json_default), status=status)
+
+
+def _json_body_response(body: str, status: int = 200) -> Dict[str, Any]:
     return {
         "statusCode": status,
         "headers": {"content-type": "application/json"},
-        "body": json.dumps(payload, default=_json_default),
+        "body": body,
     }
 
 
@@ -63,40 +98,104 @@ def _resolve_dashboard_url() -> str:
     return "http://localhost:8888/api/dashboard"
 
 
-def _fetch_dashboard_payload() -> Dict[str, Any]:
+def _fetch_dashboard_payload() -> bytes:
     url = _resolve_dashboard_url()
     req = request.Request(url, headers={"Accept": "application/json"})
     try:
         with request.urlopen(req, timeout=30) as response:
-            data = response.read().decode("utf-8")
-            return json.loads(data)
+            return response.read()
     except error.HTTPError as exc:  # pragma: no cover - defensive
         raise RuntimeError(f"Dashboard request failed with status {exc.code}") from exc
     except error.URLError as exc:  # pragma: no cover - defensive
         raise RuntimeError("Unable to reach dashboard endpoint") from exc
 
 
-def _normalize_value(value: Any):
-    if isinstance(value, str):
-        stripped = value.strip()
-        return stripped if stripped else np.nan
-    if value is None:
-        return np.nan
-    return value
+def _normalize_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Strip string cells and turn blanks/None into NaN, one column at a time."""
+    for column in df.select_dtypes(include="object").columns:
+        series = df[column]
+        try:
+            stripped = series.str.strip()
+        except AttributeError:  # column holds no strings at all
+            stripped = series
+        else:
+            stripped = stripped.where(stripped.notna(), series)
+        df[column] = stripped.mask(stripped.isna() | stripped.eq(""), np.nan)
+    return df.infer_objects()
+
+
+def _categorize_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Store low-cardinality text columns as categoricals so counting works on codes."""
+    for column in df.select_dtypes(include="object").columns:
+        series = df[column]
+        # Categories keep first-appearance order, matching how value_counts breaks ties on raw text.
+        categories = series.dropna().unique()
+        if categories.size <= _CATEGORY_MAX_DISTINCT:
+            df[column] = series.astype(pd.CategoricalDtype(categories))
+    return df
+
+
+def _read_snapshot(path: str) -> Optional[pd.DataFrame]:
+    if not os.path.exists(path):
+        return None
+    try:
+        return pd.read_parquet(path, memory_map=True)
+    except (ImportError, OSError, ValueError):
+        return None
+
+
+def _write_snapshot(df: pd.DataFrame, path: str) -> None:
+    partial = f"{path}.{os.getpid()}.tmp"
+    try:
+        df.to_parquet(partial, index=False)
+        os.replace(partial, path)
+        _remove_stale_snapshots(keep=path)
+    except (ImportError, OSError, ValueError, TypeError, NotImplementedError):
+        # Mixed-type columns have no Parquet equivalent; the in-memory cache still applies.
+        if os.path.exists(partial):
+            os.remove(partial)
+
+
+def _remove_stale_snapshots(*, keep: str) -> None:
+    # Only the latest payload is ever read back, and /tmp is small on Netlify.
+    for stale in glob.glob(os.path.join(_SNAPSHOT_DIR, "analysis-*.parquet")):
+        if stale != keep:
+            try:
+                os.remove(stale)
+            except OSError:  # another invocation may have removed it already
+                pass
 
 
 def _load_dataset(*, force: bool = False) -> pd.DataFrame:
+    # The cached frame is shared between requests; callers only read from it.
     if not force and _DATA_CACHE.get("df") is not None:
-        return _DATA_CACHE["df"].copy()
-
-    payload = _fetch_dashboard_payload()
-    rows = payload.get("analysisRows") or payload.get("rows") or []
-    df = pd.DataFrame(rows)
-    if not df.empty:
-        df = df.applymap(_normalize_value)
+        return _DATA_CACHE["df"]
+
+    raw = _fetch_dashboard_payload()
+    # The digest only names the cache file, so it stays usable on FIPS-enabled runtimes.
+    digest = hashlib.md5(raw, usedforsecurity=False).hexdigest()
+    snapshot_path = os.path.join(_SNAPSHOT_DIR, f"analysis-{digest}.parquet")
+    df = _read_snapshot(snapshot_path)
+    if df is None:
+        payload = orjson.loads(raw)
+        rows = payload.get("analysisRows") or payload.get("rows") or []
+        # Building from columns skips DataFrame's row-by-row dict unpacking.
+        columns = dict.fromkeys(key for row in rows for key in row)
+        df = pd.DataFrame({column: [row.get(column) for row in rows] for column in columns})
+        if not df.empty:
+            df = _categorize_frame(_normalize_frame(df))
+            _write_snapshot(df, snapshot_path)
     _DATA_CACHE["df"] = df
     _DATA_CACHE["fields"] = _infer_fields(df)
-    return df.copy()
+    _DATA_CACHE["field_meta"] = {field["name"]: field for field in _DATA_CACHE["fields"]}
+    _DATA_CACHE["numeric"] = {
+        field["name"]: pd.to_numeric(df[field["name"]], errors="coerce").astype("float64")
+        for field in _DATA_CACHE["fields"]
+        if field["type"] == "numeric"
+    }
+    _DATA_CACHE["topbreak_series"] = OrderedDict()
+    _table_body.cache_clear()
+    return df
 
 
 def _infer_fields(df: pd.DataFrame) -> List[Dict[str, Any]]:
@@ -106,13 +205,21 @@ def _infer_fields(df: pd.DataFrame) -> List[Dict[str, Any]]:
 
     for column in df.columns:
         series = df[column]
-        series = series.replace("", np.nan)
+        numeric_dtype = is_numeric_dtype(series)
+        if not numeric_dtype:
+            series = series.replace("", np.nan)
         non_null = series.dropna()
-        distinct = int(non_null.nunique())
+        distinct = int(non_null.unique().size)
         numeric_ratio = 0.0
         if len(non_null) > 0:
-            numeric_candidate = pd.to_numeric(non_null, errors="coerce")
-            numeric_ratio = float(numeric_candidate.notna().mean())
+            if numeric_dtype:
+                numeric_ratio = 1.0
+            else:
+                sample = non_null
+                if len(sample) > _INFER_SAMPLE_SIZE:
+                    sample = sample.sample(_INFER_SAMPLE_SIZE, random_state=0)
+                numeric_candidate = pd.to_numeric(sample, errors="coerce")
+                numeric_ratio = float(numeric_candidate.notna().mean())
         inferred_type = "numeric" if numeric_ratio >= 0.8 else "categorical"
         fields.append({
             "name": column,
@@ -122,6 +229,33 @@ def _infer_fields(df: pd.DataFrame) -> List[Dict[str, Any]]:
     return fields
 
 
+def _replace_labels(series: pd.Series, labels: pd.Index, replacement: str) -> pd.Series:
+    """Swap every value found in ``labels`` for ``replacement``."""
+    if not isinstance(series.dtype, pd.CategoricalDtype):
+        return series.where(~series.isin(labels), replacement)
+
+    # Relabel the categories, then remap the codes; merged labels share one code.
+    categories = series.cat.categories
+    relabeled = categories.where(~categories.isin(labels), replacement)
+    merged = relabeled.unique()
+    codes = series.cat.codes.to_numpy()
+    codes = np.where(codes >= 0, merged.get_indexer(relabeled)[codes], -1)
+    return pd.Series(
+        pd.Categorical.from_codes(codes, categories=merged),
+        index=series.index,
+        name=series.name,
+    )
+
+
+def _top_n_mask(counts: np.ndarray, n: int) -> np.ndarray:
+    """Mark the ``n`` largest counts, breaking ties in favour of entries that come first in ``counts``."""
+    threshold = np.partition(counts, counts.size - n)[counts.size - n]
+    keep = counts > threshold
+    ties = np.flatnonzero(counts == threshold)
+    keep[ties[: n - int(keep.sum())]] = True
+    return keep
+
+
 def _series_to_categorical(
     series: pd.Series,
     *,
@@ -133,27 +267,34 @@ def _series_to_categorical(
     working = series.copy()
     working = working.replace("", np.nan)
 
+    categorical = isinstance(working.dtype, pd.CategoricalDtype)
     if drop_missing:
         working = working.dropna()
     else:
+        if categorical and missing_label not in working.cat.categories:
+            working = working.cat.add_categories(missing_label)
         working = working.fillna(missing_label)
+    if categorical:
+        working = working.cat.remove_unused_categories()
 
     if working.empty:
         return working
 
-    counts = working.value_counts(dropna=False)
+    # Unsorted counts list object labels in first-appearance order and categoricals in category
+    # order. Loaded categories follow first appearance in the full dataset, so a take= slice
+    # breaks ties by dataset order rather than by order within the slice.
+    counts = working.value_counts(dropna=False, sort=False)
 
     if min_count > 1:
         rare_labels = counts[counts < min_count].index
         if len(rare_labels) > 0:
             other_label = f"Other (n<{min_count})"
-            working = working.apply(lambda value: value if value not in rare_labels else other_label)
-            counts = working.value_counts(dropna=False)
+            working = _replace_labels(working, rare_labels, other_label)
+            counts = working.value_counts(dropna=False, sort=False)
 
     if limit and len(counts) > limit:
-        keep = counts.index[: max(1, limit - 1)]
-        other_label = "Other"
-        working = working.apply(lambda value: value if value in keep else other_label)
+        keep = _top_n_mask(counts.to_numpy(), max(1, limit - 1))
+        working = _replace_labels(working, counts.index[~keep], "Other")
 
     return working
 
@@ -166,19 +307,61 @@ def _prepare_topbreak_series(
     drop_missing: bool,
     min_count: int,
 ) -> pd.Series:
+    # Only the full cached frame is memoized; `take` slices are rebuilt each time.
+    memo = _DATA_CACHE["topbreak_series"] if df is _DATA_CACHE.get("df") else None
+    key = (column, limit, drop_missing, min_count)
+    if memo is not None and key in memo:
+        memo.move_to_end(key)
+        return memo[key]
+
     series = df[column]
     if column == "a8_age":
-        numeric = pd.to_numeric(series, errors="coerce")
-        bins = [-math.inf, 24, 34, 44, math.inf]
-        labels = ["15-24", "25-34", "35-44", "45+"]
-        series = pd.cut(numeric, bins=bins, labels=labels)
-    return _series_to_categorical(series, limit=limit, drop_missing=drop_missing, min_count=min_count)
+        numeric = pd.to_numeric(series, errors="coerce").to_numpy(dtype=float)
+        codes = np.digitize(numeric, _AGE_EDGES, right=True)
+        codes[np.isnan(numeric)] = -1
+        series = pd.Series(
+            pd.Categorical.from_codes(codes, dtype=_AGE_DTYPE),
+            index=series.index,
+            name=column,
+        )
+    result = _series_to_categorical(series, limit=limit, drop_missing=drop_missing, min_count=min_count)
+    if memo is not None:
+        memo[key] = result
+        # Each entry is a full-length series, so only the most recent few are kept.
+        while len(memo) > _TOPBREAK_MEMO_SIZE:
+            memo.popitem(last=False)
+    return result
+
+
+def _format_percentages(values: np.ndarray) -> np.ndarray:
+    values = np.asarray(values, dtype=float)
+    return np.where(np.isnan(values), "0.0%", np.char.mod("%.1f%%", values))
+
+
+def _render_html(frame: pd.DataFrame, *, title: str, subtitle: Optional[str] = None) -> str:
+    gt_table = GT(frame)
+    gt_table = gt_table.tab_header(title=title, subtitle=subtitle)
+    gt_table = gt_table.opt_row_striping()
+    return gt_table.to_html()
+
 
+def _crosstab_with_total(top_codes: np.ndarray, var_codes: np.ndarray, n_top: int, n_var: int) -> np.ndarray:
+    """Count (top, var) code pairs into an ``n_top x (n_var + 1)`` matrix whose last column is the row total."""
+    # Counting into a width of n_var + 1 leaves the last column free for the totals.
+    flat = top_codes * (n_var + 1) + var_codes
+    counts = np.bincount(flat, minlength=n_top * (n_var + 1)).reshape(n_top, n_var + 1)
+    counts[:, -1] = counts[:, :-1].sum(axis=1)
+    return counts
 
-def _format_percentage(value: float) -> str:
-    if pd.isna(value):
-        return "0.0%"
-    return f"{value:.1f}%"
+
+def _stat_matrix(counts: np.ndarray, stat: str, *, row_totals: np.ndarray, total: int) -> np.ndarray:
+    if stat == "rowpct":
+        return counts / row_totals[:, None] * 100
+    if stat == "colpct":
+        return counts / counts.sum(axis=0) * 100
+    if stat == "totalpct":
+        return counts / total * 100
+    return counts
 
 
 def _build_categorical_table(
@@ -190,6 +373,7 @@ def _build_categorical_table(
     limit: int,
     drop_missing: bool,
     min_count: int,
+    fmt: str = DEFAULT_FORMAT,
 ) -> Dict[str, Any]:
     raw_top = df[topbreak]
     raw_var = df[variable]
@@ -200,17 +384,15 @@ def _build_categorical_table(
     if working.empty:
         raise ValueError("No overlapping records for the selected fields")
 
-    top_categories = list(dict.fromkeys(working["top"].tolist()))
-    var_categories = list(dict.fromkeys(working["var"].tolist()))
-
-    counts = pd.crosstab(working["top"], working["var"], dropna=False)
-    counts = counts.reindex(index=top_categories, columns=var_categories, fill_value=0)
-
-    totals = counts.values.sum()
-    counts_with_total = counts.assign(Total=counts.sum(axis=1))
-    row_pct = counts_with_total.div(counts_with_total.sum(axis=1).replace(0, np.nan), axis=0) * 100
-    col_pct = counts_with_total.div(counts_with_total.sum(axis=0).replace(0, np.nan), axis=1) * 100
-    total_pct = (counts_with_total / totals * 100) if totals else counts_with_total * 0
+    # Codes follow first appearance, which is the order the table and chart list categories in.
+    top_codes, top_categories = pd.factorize(working["top"])
+    var_codes, var_categories = pd.factorize(working["var"])
+    counts_with_total = _crosstab_with_total(top_codes, var_codes, len(top_categories), len(var_categories))
+    row_totals = counts_with_total[:, -1]
+    totals = int(row_totals.sum())
+    # Every category was observed, so no margin is zero. One matrix serves both outputs:
+    # the table shows every column, the chart drops Total.
+    stat_values = _stat_matrix(counts_with_total, stat, row_totals=row_totals, total=totals)
 
     stat_labels = {
         "counts": "Count",
@@ -220,58 +402,45 @@ def _build_categorical_table(
     }
     stat_label = stat_labels[stat]
 
-    stat_tables = {
-        "counts": counts_with_total,
-        "rowpct": row_pct,
-        "colpct": col_pct,
-        "totalpct": total_pct,
-    }
-
-    display_matrix = stat_tables[stat]
-    display = pd.DataFrame(index=display_matrix.index)
-    for column in display_matrix.columns:
-        values = display_matrix[column]
+    html = ""
+    if fmt in _HTML_FORMATS:
         if stat == "counts":
-            display[f"{column} ({stat_label})"] = values.astype(int)
+            cells = stat_values.astype(int)
         else:
-            display[f"{column} ({stat_label})"] = values.map(_format_percentage)
-    display.insert(0, topbreak, display_matrix.index)
-
-    gt_table = GT(display.reset_index(drop=True))
-    gt_table = gt_table.tab_header(title=f"{variable} by {topbreak}", subtitle=f"Statistic: {stat_label}")
-    gt_table = gt_table.opt_row_striping()
-    html = gt_table.to_html()
-
-    chart_matrices = {
-        "counts": counts,
-        "rowpct": counts.div(counts.sum(axis=1).replace(0, np.nan), axis=0) * 100,
-        "colpct": counts.div(counts.sum(axis=0).replace(0, np.nan), axis=1) * 100,
-        "totalpct": (counts / totals * 100) if totals else counts * 0,
-    }
-    stat_matrix = chart_matrices[stat]
-
-    chart_series = []
-    for column in stat_matrix.columns:
-        points = []
-        for category in stat_matrix.index:
-            value = float(stat_matrix.loc[category, column])
-            points.append({"x": str(category), "y": value})
-        chart_series.append({"name": str(column), "data": points})
-
-    chart = {
-        "kind": "stacked_bar",
-        "x": topbreak,
-        "series": chart_series,
-        "labels": {
+            cells = _format_percentages(stat_values)
+        columns = {topbreak: top_categories.astype(object)}
+        for position, column in enumerate([*var_categories, "Total"]):
+            columns[f"{column} ({stat_label})"] = cells[:, position]
+        display = pd.DataFrame(columns)
+        html = _render_html(
+            display,
+            title=f"{variable} by {topbreak}",
+            subtitle=f"Statistic: {stat_label}",
+        )
+
+    chart = None
+    if fmt != "html":
+        stat_matrix = stat_values[:, :-1].astype(float)
+        top_labels = top_categories.astype(str).tolist()
+        chart_series = [
+            {"name": name, "data": [{"x": x, "y": y} for x, y in zip(top_labels, column)]}
+            for name, column in zip(var_categories.astype(str).tolist(), stat_matrix.T.tolist())
+        ]
+
+        chart = {
+            "kind": "stacked_bar",
             "x": topbreak,
-            "y": stat_label,
-        },
-    }
+            "series": chart_series,
+            "labels": {
+                "x": topbreak,
+                "y": stat_label,
+            },
+        }
 
     notes: List[str] = []
-    if raw_var.dropna().nunique() > len(set(var_series)):
+    if raw_var.dropna().nunique() > var_series.nunique():
         notes.append(f"Variable categories limited to top {limit}")
-    if raw_top.dropna().nunique() > len(set(top_series)):
+    if raw_top.dropna().nunique() > top_series.nunique():
         notes.append(f"Top break categories limited to top {limit}")
 
     meta = {
@@ -285,6 +454,22 @@ def _build_categorical_table(
     return {"html": html, "chart": chart, "meta": meta}
 
 
+def _group_order(labels: pd.Index) -> np.ndarray:
+    """Positions that list summary groups by label, or by band for ordered categoricals like a8_age.
+
+    Loaded categoricals keep first-appearance categories for value_counts tie-breaking, so
+    their category order is data order and not a display order.
+    """
+    if isinstance(labels, pd.CategoricalIndex):
+        if labels.ordered:
+            return labels.argsort()
+        labels = labels.astype(object)
+    try:
+        return labels.argsort()
+    except TypeError:  # mixed label types have no common order
+        return np.arange(len(labels))
+
+
 def _build_numeric_table(
     df: pd.DataFrame,
     topbreak: str,
@@ -294,116 +479,135 @@ def _build_numeric_table(
     drop_missing: bool,
     min_count: int,
     bins: int,
+    fmt: str = DEFAULT_FORMAT,
 ) -> Dict[str, Any]:
     top_series = _prepare_topbreak_series(df, topbreak, limit=limit, drop_missing=drop_missing, min_count=min_count)
-    numeric_series = pd.to_numeric(df[variable], errors="coerce")
+    numeric_series = _DATA_CACHE["numeric"].get(variable) if df is _DATA_CACHE.get("df") else None
+    if numeric_series is None:
+        numeric_series = pd.to_numeric(df[variable], errors="coerce")
     working = pd.DataFrame({"top": top_series, "value": numeric_series}).dropna()
 
     if working.empty:
         raise ValueError("No numeric values available for the selected fields")
 
-    grouped = working.groupby("top")["value"]
-    summary = grouped.agg(["count", "mean", "median", "std"]).reset_index()
+    groups = working.groupby("top", observed=True, sort=False)
+    summary = groups["value"].agg(["count", "mean", "median", "std"])
+    group_order = _group_order(summary.index)
+    summary = summary.iloc[group_order].reset_index()
     summary["std"] = summary["std"].fillna(0.0)
 
-    summary_display = summary.copy()
-    summary_display["mean"] = summary_display["mean"].map(lambda value: f"{value:.2f}")
-    summary_display["median"] = summary_display["median"].map(lambda value: f"{value:.2f}")
-    summary_display["std"] = summary_display["std"].map(lambda value: f"{value:.2f}")
-
-    gt_table = GT(summary_display)
-    gt_table = gt_table.tab_header(title=f"{variable} summary by {topbreak}")
-    gt_table = gt_table.opt_row_striping()
-    html = gt_table.to_html()
-
-    chart_series = [
-        {
-            "name": "mean",
-            "data": [
-                {"x": str(row["top"]), "y": float(row["mean"]), "error": float(row["std"])}
-                for _, row in summary.iterrows()
-            ],
+    html = ""
+    if fmt in _HTML_FORMATS:
+        summary_display = summary.copy()
+        # Load-time categoricals render as plain labels, as they did before categorisation;
+        # ordered bands like a8_age stay categorical, which great_tables centres.
+        top_dtype = summary_display["top"].dtype
+        if not (isinstance(top_dtype, pd.CategoricalDtype) and top_dtype.ordered):
+            summary_display["top"] = summary_display["top"].astype(object)
+        for column in ("mean", "median", "std"):
+            summary_display[column] = np.char.mod("%.2f", summary_display[column].to_numpy(dtype=float))
+        html = _render_html(summary_display, title=f"{variable} summary by {topbreak}")
+
+    chart = None
+    if fmt != "html":
+        chart_series = [
+            {
+                "name": "mean",
+                "data": [
+                    {"x": x, "y": mean, "error": std}
+                    for x, mean, std in zip(
+                        summary["top"].astype(str).tolist(),
+                        summary["mean"].astype(float).tolist(),
+                        summary["std"].astype(float).tolist(),
+                    )
+                ],
+            }
+        ]
+
+        chart = {
+            "kind": "grouped_bar",
+            "x": topbreak,
+            "series": chart_series,
+            "labels": {"x": topbreak, "y": f"Mean {variable}"},
         }
-    ]
 
-    histogram = None
-    valid_values = working["value"].dropna()
-    if not valid_values.empty:
-        bin_edges = np.histogram_bin_edges(valid_values, bins=bins)
-        histogram_series = []
-        labels = [f"{bin_edges[i]:.1f}–{bin_edges[i + 1]:.1f}" for i in range(len(bin_edges) - 1)]
-        for category, group in working.groupby("top"):
-            counts, _ = np.histogram(group["value"], bins=bin_edges)
-            histogram_series.append(
-                {
-                    "name": str(category),
-                    "data": [
-                        {"x": labels[i], "y": int(counts[i])}
-                        for i in range(len(counts))
-                    ],
-                }
-            )
-        histogram = {
+    notes: List[str] = []
+    if fmt in _HISTOGRAM_FORMATS:
+        values = working["value"].to_numpy(dtype=float)
+        bin_edges = np.histogram_bin_edges(values, bins=bins)
+        n_bins = len(bin_edges) - 1
+        # Same bins as np.histogram: half-open except the last, which includes the maximum.
+        bin_index = np.clip(np.searchsorted(bin_edges, values, side="right") - 1, 0, n_bins - 1)
+        group_index = groups.ngroup().to_numpy()
+        n_groups = len(summary)
+        hist2d = np.bincount(group_index * n_bins + bin_index, minlength=n_groups * n_bins)
+        hist2d = hist2d.reshape(n_groups, n_bins)[group_order].tolist()
+        labels = [f"{bin_edges[i]:.1f}–{bin_edges[i + 1]:.1f}" for i in range(n_bins)]
+        histogram_series = [
+            {"name": name, "data": [{"x": x, "y": y} for x, y in zip(labels, row)]}
+            for name, row in zip(summary["top"].astype(str).tolist(), hist2d)
+        ]
+        chart["histogram"] = {
             "kind": "hist",
             "x": "value_bin",
             "series": histogram_series,
             "labels": {"x": "Value bin", "y": "Count"},
         }
-
-    chart = {
-        "kind": "grouped_bar",
-        "x": topbreak,
-        "series": chart_series,
-        "labels": {"x": topbreak, "y": f"Mean {variable}"},
-    }
-    if histogram:
-        chart["histogram"] = histogram
+        notes.append(f"Histogram computed with {bins} bins")
 
     meta = {
         "topbreak": topbreak,
         "variable": variable,
-        "n": int(len(valid_values)),
+        "n": int(len(working)),
         "stat": "summary",
-        "notes": [f"Histogram computed with {bins} bins"],
+        "notes": notes,
     }
 
     return {"html": html, "chart": chart, "meta": meta}
 
 
-def _build_single_categorical(df: pd.DataFrame, variable: str, *, limit: int, drop_missing: bool, min_count: int) -> Dict[str, Any]:
+def _build_single_categorical(
+    df: pd.DataFrame,
+    variable: str,
+    *,
+    limit: int,
+    drop_missing: bool,
+    min_count: int,
+    fmt: str = DEFAULT_FORMAT,
+) -> Dict[str, Any]:
     series = _series_to_categorical(df[variable], limit=limit, drop_missing=drop_missing, min_count=min_count)
     if series.empty:
         raise ValueError("No records available for the selected variable")
 
     counts = series.value_counts()
-    percentages = counts / counts.sum() * 100
-    display = pd.DataFrame({
-        variable: counts.index,
-        "count": counts.values,
-        "percent": percentages.map(_format_percentage),
-    })
-
-    gt_table = GT(display)
-    gt_table = gt_table.tab_header(title=f"Distribution of {variable}")
-    gt_table = gt_table.opt_row_striping()
-    html = gt_table.to_html()
-
-    chart_series = [
-        {
-            "name": "count",
-            "data": [
-                {"x": str(index), "y": int(value)}
-                for index, value in counts.items()
-            ],
+    html = ""
+    if fmt in _HTML_FORMATS:
+        percentages = counts / counts.sum() * 100
+        display = pd.DataFrame({
+            variable: counts.index.astype(object),
+            "count": counts.values,
+            "percent": _format_percentages(percentages.to_numpy()),
+        })
+        html = _render_html(display, title=f"Distribution of {variable}")
+
+    chart = None
+    if fmt != "html":
+        chart_series = [
+            {
+                "name": "count",
+                "data": [
+                    {"x": str(index), "y": int(value)}
+                    for index, value in counts.items()
+                ],
+            }
+        ]
+
+        chart = {
+            "kind": "bar",
+            "x": variable,
+            "series": chart_series,
+            "labels": {"x": variable, "y": "Count"},
         }
-    ]
-
-    chart = {
-        "kind": "bar",
-        "x": variable,
-        "series": chart_series,
-        "labels": {"x": variable, "y": "Count"},
-    }
 
     meta = {
         "topbreak": None,
@@ -471,6 +675,10 @@ def _table_response(params: Dict[str, str]) -> Dict[str, Any]:
     if stat not in _ALLOWED_STATS:
         return _json_response({"error": f"Unsupported stat '{stat}'"}, status=400)
 
+    fmt = params.get("format", DEFAULT_FORMAT)
+    if fmt not in _ALLOWED_FORMATS:
+        return _json_response({"error": f"Unsupported format '{fmt}'"}, status=400)
+
     try:
         limit = int(params.get("limit_categories", DEFAULT_LIMIT_CATEGORIES))
     except (TypeError, ValueError):
@@ -491,10 +699,9 @@ def _table_response(params: Dict[str, str]) -> Dict[str, Any]:
         take = int(params.get("take", "0"))
     except (TypeError, ValueError):
         take = 0
-    if take > 0:
-        df = df.head(take)
+    take = max(take, 0)
 
-    fields_lookup = {field["name"]: field for field in (_DATA_CACHE.get("fields") or _infer_fields(df))}
+    fields_lookup = _DATA_CACHE.get("field_meta") or {field["name"]: field for field in _infer_fields(df)}
     if variable not in fields_lookup:
         return _json_response({"error": f"Unknown variable '{variable}'"}, status=400)
 
@@ -502,39 +709,76 @@ def _table_response(params: Dict[str, str]) -> Dict[str, Any]:
         return _json_response({"error": f"Unknown top break '{topbreak}'"}, status=400)
 
     try:
-        if topbreak:
-            if fields_lookup[variable]["type"] == "numeric":
-                payload = _build_numeric_table(
-                    df,
-                    topbreak,
-                    variable,
-                    limit=limit,
-                    drop_missing=drop_missing,
-                    min_count=min_count,
-                    bins=bins,
-                )
-            else:
-                payload = _build_categorical_table(
-                    df,
-                    topbreak,
-                    variable,
-                    stat=stat,
-                    limit=limit,
-                    drop_missing=drop_missing,
-                    min_count=min_count,
-                )
+        body = _table_body(
+            topbreak or None,
+            variable,
+            numeric=fields_lookup[variable]["type"] == "numeric",
+            stat=stat,
+            limit=limit,
+            drop_missing=drop_missing,
+            min_count=min_count,
+            bins=bins,
+            take=take,
+            fmt=fmt,
+        )
+    except ValueError as exc:
+        return _json_response({"error": str(exc)}, status=400)
+
+    return _json_body_response(body)
+
+
+@lru_cache(maxsize=128)
+def _table_body(
+    topbreak: Optional[str],
+    variable: str,
+    *,
+    numeric: bool,
+    stat: str,
+    limit: int,
+    drop_missing: bool,
+    min_count: int,
+    bins: int,
+    take: int,
+    fmt: str,
+) -> str:
+    """Build and encode a /table payload; cleared whenever _load_dataset reloads the data."""
+    df = _DATA_CACHE["df"]
+    if take > 0:
+        df = df.iloc[:take]
+
+    if topbreak:
+        if numeric:
+            payload = _build_numeric_table(
+                df,
+                topbreak,
+                variable,
+                limit=limit,
+                drop_missing=drop_missing,
+                min_count=min_count,
+                bins=bins,
+                fmt=fmt,
+            )
         else:
-            payload = _build_single_categorical(
+            payload = _build_categorical_table(
                 df,
+                topbreak,
                 variable,
+                stat=stat,
                 limit=limit,
                 drop_missing=drop_missing,
                 min_count=min_count,
+                fmt=fmt,
             )
-    except ValueError as exc:
-        return _json_response({"error": str(exc)}, status=400)
-
-    return _json_response(payload)
+    else:
+        payload = _build_single_categorical(
+            df,
+            variable,
+            limit=limit,
+            drop_missing=drop_missing,
+            min_count=min_count,
+            fmt=fmt,
+        )
+    return json.dumps(payload, default=_json_default)
 
 
 def handler(event, _context):